@@ -0,0 +1,101 @@
+"""Share-image rendering throughput and memory.
+
+Analyzes one synthetic statement written with synth.py, varies its monthly
+spend and category shares into --users distinct insights dicts, and renders
+their charts three ways: building fresh figures for every user, reusing the
+chart templates in one process, and reusing them across a process pool.
+Prints charts per second for each, the peak traced memory per chart for the
+two in-process ways, and the process's RSS growth over the template run (to
+catch figures that are never freed).
+
+    python benchmarks/bench_charts.py [--users 200] [--workers 2 4]
+"""
+import argparse
+import copy
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import venmo_wrapped as vw
+from synth import write_statement
+
+CHARTS_PER_USER = 2
+
+def vary(insights, n_users, seed=0):
+    """n_users copies of insights with their own monthly spend and category shares."""
+    rng = np.random.default_rng(seed)
+    users = []
+    for _ in range(n_users):
+        user = copy.deepcopy(insights)
+        overview = user['spending_overview']
+        overview['monthly_spend'] = [amount * scale for amount, scale in
+                                     zip(overview['monthly_spend'], rng.uniform(0.2, 3, 12))]
+        overview['total_spent'] = sum(overview['monthly_spend'])
+        breakdown = user['transaction_categories']['category_breakdown']
+        shares = rng.dirichlet(np.ones(len(breakdown))) * 100
+        for stats, share in zip(breakdown.values(), shares):
+            stats['percentage'] = float(share)
+        users.append(user)
+    return users
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_in_process(users, tmp, render):
+    start = time.perf_counter()
+    for i, user in enumerate(users):
+        render(user, os.path.join(tmp, str(i)))
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    render(users[0], os.path.join(tmp, 'traced'))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / CHARTS_PER_USER
+
+def run_pool(users, tmp, workers):
+    jobs = [({'file': str(i), 'data': user}, os.path.join(tmp, str(i))) for i, user in enumerate(users)]
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=vw.chart_templates) as pool:
+        outcomes = list(pool.map(vw.render_result, jobs, chunksize=4))
+    elapsed = time.perf_counter() - start
+    assert not [outcome for outcome in outcomes if 'error' in outcome]
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--workers', type=int, nargs='+', default=[2, 4])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'statement.csv')
+        write_statement(path, 20_000)
+        users = vary(vw.analyze_venmo_statement(path), args.users)
+        n_charts = len(users) * CHARTS_PER_USER
+        print(f'{os.cpu_count()} CPUs, {n_charts} charts')
+        print(f"{'mode':>16} {'seconds':>8} {'charts/s':>9} {'peak KB/chart':>14}")
+
+        fresh = lambda user, output_dir: vw.ChartTemplates().render(user, output_dir)
+        elapsed, peak = run_in_process(users, os.path.join(tmp, 'fresh'), fresh)
+        print(f"{'fresh figures':>16} {elapsed:>8.2f} {n_charts / elapsed:>9.1f} {peak / 1024:>14.0f}")
+
+        vw.chart_templates()
+        rss_before = rss_mb()
+        elapsed, peak = run_in_process(users, os.path.join(tmp, 'template'), vw.generate_visualizations)
+        print(f"{'templates':>16} {elapsed:>8.2f} {n_charts / elapsed:>9.1f} {peak / 1024:>14.0f}")
+        print(f'RSS growth over the template run: {rss_mb() - rss_before:.1f} MB')
+
+        for workers in args.workers:
+            elapsed = run_pool(users, os.path.join(tmp, f'pool{workers}'), workers)
+            print(f"{f'pool x{workers}':>16} {elapsed:>8.2f} {n_charts / elapsed:>9.1f} {'-':>14}")
+
+if __name__ == '__main__':
+    main()
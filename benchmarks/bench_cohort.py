@@ -0,0 +1,61 @@
+"""Per-user throughput of cohort analysis against one pipeline per statement.
+
+Writes --users small synthetic statements with synth.py, analyzes a sample of
+them one at a time with analyze_file, then analyzes all of them with
+analyze_cohort in batches of each --batch-mb size. Prints users per second
+for each, and checks the cohort results for the sample match the single-user
+ones exactly.
+
+    python benchmarks/bench_cohort.py [--users 5000] [--rows 250] [--sample 200] [--batch-mb 16 64]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import venmo_wrapped as vw
+from synth import write_statement
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--rows', type=int, default=250)
+    parser.add_argument('--people', type=int, default=15)
+    parser.add_argument('--sample', type=int, default=200)
+    parser.add_argument('--batch-mb', type=float, nargs='+', default=[16, 64])
+    args = parser.parse_args()
+
+    # Build the emoji matcher up front so neither mode's timing pays for it
+    vw.warm_worker()
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for user in range(args.users):
+            path = os.path.join(tmp, f'user_{user}.csv')
+            write_statement(path, args.rows, seed=user, n_people=args.people, raw=user % 3 == 0)
+            paths.append(path)
+        size_mb = sum(os.path.getsize(path) for path in paths) / 2**20
+        print(f'{args.users} statements of ~{args.rows} rows, {size_mb:.1f} MB')
+        print(f"{'mode':>16} {'users':>7} {'seconds':>8} {'users/s':>8} {'speedup':>8}")
+
+        sample = paths[:args.sample]
+        start = time.perf_counter()
+        expected = [vw.dumps_json(vw.analyze_file(path)) for path in sample]
+        single_rate = len(sample) / (time.perf_counter() - start)
+        print(f"{'per statement':>16} {len(sample):>7} {len(sample) / single_rate:>8.2f} {single_rate:>8.1f} "
+              f"{'1.00x':>8}")
+
+        for batch_mb in args.batch_mb:
+            start = time.perf_counter()
+            results = [result for batch in vw.cohort_batches(paths, int(batch_mb * 2**20))
+                       for result in vw.analyze_cohort(batch)]
+            elapsed = time.perf_counter() - start
+            assert [vw.dumps_json(result) for result in results[:len(sample)]] == expected
+            rate = len(paths) / elapsed
+            print(f"{f'cohort {batch_mb:g} MB':>16} {len(paths):>7} {elapsed:>8.2f} {rate:>8.1f} "
+                  f'{rate / single_rate:>7.2f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Date-range insights from the aggregate cube against re-scanning the payments.
+
+Writes a two-year synthetic statement with synth.py for each --rows, builds
+its AggregateCube once, then answers the last 90 days, each quarter, and the
+two years side by side (year over year) both from the cube and by filtering
+the payments frame and running AnalysisState.from_frame on the slice. Prints
+the build time and the per-range time of both, checking they agree.
+
+    python benchmarks/bench_cube.py [--rows 100000 1000000] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import venmo_wrapped as vw
+from synth import write_statement
+
+def date_ranges(first_day, last_day):
+    day = lambda value: np.datetime64(value, 'D')
+    ranges = {'last 90 days': (day(last_day) - 89, day(last_day))}
+    for year in (2024, 2025):
+        for quarter, (start, end) in enumerate([('01-01', '03-31'), ('04-01', '06-30'),
+                                                ('07-01', '09-30'), ('10-01', '12-31')], 1):
+            ranges[f'{year} Q{quarter}'] = (day(f'{year}-{start}'), day(f'{year}-{end}'))
+    for year in (2024, 2025):
+        ranges[f'{year}'] = (day(f'{year}-01-01'), day(f'{year}-12-31'))
+    return ranges
+
+def rescan(df, days, has_time, start, end):
+    """The same sections by filtering the frame and summarizing the slice."""
+    first_day, last_day = vw.parse_day(start), vw.parse_day(end)
+    state = vw.AnalysisState.from_frame(df[has_time & (days >= first_day) & (days <= last_day)], vw.RANGE_SECTIONS)
+    insights = {"spending_overview": vw.get_spending_overview(state, vw.calendar_months(first_day, last_day))}
+    insights.update(state.insights(vw.RANGE_SECTIONS[1:]))
+    return vw.to_native(insights)
+
+def best_of(repeat, run):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in args.rows:
+            path = os.path.join(tmp, f'statement_{n_rows}.csv')
+            write_statement(path, n_rows, days=730)
+            df = vw.load_payments(path)
+            build_time, cube = best_of(1, lambda: vw.AggregateCube.from_frame(df))
+            print(f'{n_rows} rows: cube of {len(cube.cells["day"])} cells built in {build_time:.2f} s')
+            print(f"{'range':>14} {'rescan ms':>10} {'cube ms':>9} {'speedup':>8}")
+            days, has_time = vw.payment_days(df), df['Datetime'].notna().to_numpy()
+            for name, (start, end) in date_ranges(*cube.days).items():
+                rescan_time, expected = best_of(args.repeat, lambda: rescan(df, days, has_time, start, end))
+                cube_time, insights = best_of(args.repeat, lambda: cube.insights(start, end))
+                del insights['date_range']
+                assert vw.dumps_json(insights) == vw.dumps_json(expected), f'{name} differs at {n_rows} rows'
+                print(f'{name:>14} {rescan_time * 1e3:>10.1f} {cube_time * 1e3:>9.1f} '
+                      f'{rescan_time / cube_time:>7.1f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""Scaling benchmark for the payment network section's PaymentGraph.
+
+Builds payment frames for a network of friend groups (most payments stay in
+a group, some cross to anyone), as merged friends' statements would give,
+and builds the payment_network section from them. Up to --check-rows it
+also builds the graph with plain dicts and union-find, checks the people,
+links, groups and netting agree and that each circular payment's edges
+carry its amount, and prints the speedup. Then it times long payment chains
+(everyone paying the person before them, with and without a three-person
+cycle at the far end), which take as many peeling rounds as they have links
+unless the cycle search stays linear.
+
+    python benchmarks/bench_graph.py [--rows 100000 300000 1000000] [--people 200000] [--group 20]
+                                     [--chain 10000 100000 300000]
+"""
+import argparse
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import venmo_wrapped as vw
+
+CROSS_GROUP_RATE = 0.1
+
+def make_payments(n_rows, n_people, group_size, seed=0):
+    rng = np.random.default_rng(seed)
+    people = np.array([f'Friend {i}' for i in range(n_people)], dtype=object)
+    group = rng.integers(0, max(n_people // group_size, 1), n_rows) * group_size
+    payer = np.minimum(group + rng.integers(0, group_size, n_rows), n_people - 1)
+    payee = np.where(rng.random(n_rows) < CROSS_GROUP_RATE, rng.integers(0, n_people, n_rows),
+                     np.minimum(group + rng.integers(0, group_size, n_rows), n_people - 1))
+    cents = rng.integers(100, 20_000, n_rows)
+    seconds = np.sort(rng.integers(0, 365 * 24 * 3600, n_rows))
+    return pd.DataFrame({'Datetime': pd.Timestamp('2024-01-01') + pd.to_timedelta(seconds, unit='s'),
+                         'From': people[payer], 'To': people[payee],
+                         'Cents': np.where(rng.random(n_rows) < 0.5, -cents, cents)})
+
+def make_chain(n_links, cycle, seed=0):
+    """Person i + 1 pays person i, numbered at random, optionally with the last three paying in a circle."""
+    payer, payee = np.arange(1, n_links + 1), np.arange(n_links)
+    if cycle:
+        payer = np.concatenate([payer, [n_links, n_links + 1, n_links + 2]])
+        payee = np.concatenate([payee, [n_links + 1, n_links + 2, n_links]])
+    people = np.array([f'Friend {i}' for i in np.random.default_rng(seed).permutation(n_links + 3)], dtype=object)
+    return pd.DataFrame({'Datetime': pd.Timestamp('2024-01-01') + pd.to_timedelta(np.arange(len(payer)), unit='s'),
+                         'From': people[payer], 'To': people[payee], 'Cents': np.full(len(payer), -500)})
+
+def reference_network(df):
+    """People, links, groups, largest group and netting with dicts and union-find."""
+    edges = defaultdict(int)
+    for payer, payee, cents in zip(df['From'], df['To'], df['Cents']):
+        if payer != payee:
+            edges[payer, payee] += abs(cents)
+    parent = {}
+    def find(person):
+        parent.setdefault(person, person)
+        while parent[person] != person:
+            parent[person] = parent[parent[person]]
+            person = parent[person]
+        return person
+    balance, pairs = defaultdict(int), defaultdict(int)
+    for (payer, payee), cents in edges.items():
+        root_a, root_b = find(payer), find(payee)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+        balance[payer] -= cents
+        balance[payee] += cents
+        pairs[min(payer, payee), max(payer, payee)] += cents if payer < payee else -cents
+    sizes = defaultdict(int)
+    for person in parent:
+        sizes[find(person)] += 1
+    netted = {pair if net > 0 else pair[::-1]: abs(net) for pair, net in pairs.items() if net}
+    return {'people': len(parent), 'payment_links': len(edges), 'groups': len(sizes),
+            'largest_group': max(sizes.values(), default=0),
+            'netting': {'total_paid': vw._dollars(sum(edges.values())),
+                        'after_pairwise_netting': vw._dollars(sum(netted.values())),
+                        'minimum_to_settle': vw._dollars(sum(cents for cents in balance.values() if cents > 0))}}, netted
+
+def payment_network(df):
+    state = vw.AnalysisState.from_frame(df, ['payment_network'])
+    return vw.get_payment_network(state), len(state.payment_edges)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 300_000, 1_000_000])
+    parser.add_argument('--people', type=int, default=200_000)
+    parser.add_argument('--group', type=int, default=20, help='people per friend group')
+    parser.add_argument('--check-rows', type=int, default=300_000, help='largest size to run the reference on')
+    parser.add_argument('--chain', type=int, nargs='+', default=[10_000, 100_000, 300_000], help='chain lengths')
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'edges':>9} {'groups':>7} {'seconds':>8} {'edges/s':>10} {'reference':>10} {'speedup':>8}")
+    for n_rows in args.rows:
+        df = make_payments(n_rows, args.people, args.group)
+        start = time.perf_counter()
+        network, n_edges = payment_network(df)
+        elapsed = time.perf_counter() - start
+        reference, speedup = '-', '-'
+        if n_rows <= args.check_rows:
+            start = time.perf_counter()
+            expected, netted = reference_network(df)
+            reference_time = time.perf_counter() - start
+            assert {key: value for key, value in network.items() if key != 'circular_payments'} == expected
+            for cycle in network['circular_payments']:
+                names = cycle['people']
+                assert all(vw._dollars(netted[payer, payee]) >= cycle['amount']
+                           for payer, payee in zip(names, names[1:] + names[:1]))
+            reference, speedup = f'{reference_time:.2f}', f'{reference_time / elapsed:.1f}x'
+        print(f"{n_rows:>10} {n_edges:>9} {network['groups']:>7} {elapsed:>8.2f} {n_edges / elapsed:>10.0f} "
+              f'{reference:>10} {speedup:>8}')
+        for cycle in network['circular_payments']:
+            print(f"{'':>10} ${cycle['amount']:.2f} around {' -> '.join(cycle['people'])}")
+
+    print(f"\n{'chain':>10} {'cycle':>6} {'seconds':>8} {'edges/s':>10}")
+    for n_links in args.chain:
+        for cycle in (False, True):
+            df = make_chain(n_links, cycle)
+            start = time.perf_counter()
+            network, n_edges = payment_network(df)
+            elapsed = time.perf_counter() - start
+            assert len(network['circular_payments']) == cycle and network['groups'] == 1
+            print(f'{n_links:>10} {str(cycle):>6} {elapsed:>8.2f} {n_edges / elapsed:>10.0f}')
+
+if __name__ == '__main__':
+    main()
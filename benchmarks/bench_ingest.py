@@ -0,0 +1,59 @@
+"""Ingestion throughput of the pyarrow CSV engine against the pandas reader.
+
+Writes synthetic statements with synth.py and loads each with
+load_payments(engine='c') and engine='pyarrow', checking both give the same
+frame. Without pyarrow installed only the pandas reader is timed.
+
+    python benchmarks/bench_ingest.py [--rows 100000 1000000 3000000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import venmo_wrapped as vw
+from synth import write_statement
+
+def best_of(path, engine, repeat):
+    best, df = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = vw.load_payments(path, engine=engine)
+        best = min(best, time.perf_counter() - start)
+    return best, df
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000, 3_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    engines = ['c']
+    if vw.arrow_csv() is not None:
+        engines.append('pyarrow')
+    else:
+        print('pyarrow is not installed; timing the pandas reader only')
+
+    print(f"{'rows':>10} {'file MB':>8} {'engine':>8} {'seconds':>9} {'MB/s':>8} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in args.rows:
+            path = os.path.join(tmp, f'statement_{n_rows}.csv')
+            write_statement(path, n_rows)
+            size_mb = os.path.getsize(path) / 2**20
+            baseline, expected = None, None
+            for engine in engines:
+                elapsed, df = best_of(path, engine, args.repeat)
+                if expected is None:
+                    baseline, expected = elapsed, df
+                else:
+                    pd.testing.assert_frame_equal(expected, df)
+                print(f'{n_rows:>10} {size_mb:>8.1f} {engine:>8} {elapsed:>9.3f} {size_mb / elapsed:>8.1f} '
+                      f'{baseline / elapsed:>7.2f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Per-insight benchmark suite on synthetic statements.
+
+Writes statements with synth.py, then times ingestion, deriving the payment
+features, each AnalysisState pass on its own, the whole state, every get_*
+and find_* builder and the end-to-end analysis, and records each
+stage's peak traced memory in a separate run so tracing does not skew the
+timings. --save-baseline stores the numbers and a digest of the insights;
+--baseline compares against a stored file and exits non-zero when a stage got
+slower than the tolerance allows or the insights changed.
+
+    python benchmarks/bench_insights.py [--rows 10000 100000] [--save-baseline FILE | --baseline FILE]
+"""
+import argparse
+import functools
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import venmo_wrapped as vw
+from synth import write_statement
+
+FINALIZERS = [
+    vw.get_spending_overview, vw.get_transaction_categories, vw.get_people_insights,
+    vw.get_time_insights, vw.get_fun_insights, vw.get_financial_habits, vw.get_social_insights,
+    vw.get_money_pingpong, vw.find_eternal_debt_cycles, vw.get_payment_network,
+]
+
+def derive_features(df):
+    """PaymentFeatures with every column derived, so the pass stages time only the passes."""
+    features = vw.PaymentFeatures(df)
+    for name, value in vars(vw.PaymentFeatures).items():
+        if isinstance(value, functools.cached_property):
+            getattr(features, name)
+    return features
+
+def stages(path):
+    """(name, fn) pairs in pipeline order; each fn takes the previous results dict."""
+    yield 'ingest', lambda r: vw.load_payments(path)
+    yield 'features', lambda r: derive_features(r['ingest'])
+    # run_pass also runs the passes one reads first (pingpong reads payment_gaps)
+    for name in vw.PASS_ORDER:
+        yield f'pass_{name}', lambda r, name=name: vw.run_pass(name, r['features'], len(r['ingest']))
+    yield 'state', lambda r: vw.AnalysisState.from_frame(r['ingest'])
+    for fn in FINALIZERS:
+        yield fn.__name__, lambda r, fn=fn: fn(r['state'])
+    # Without the result cache, which would answer every repeat from memory
+    yield 'end_to_end', lambda r: vw.analyze_venmo_statement(path, results=False)
+
+def measure(path, repeat):
+    """Best-of-repeat seconds and peak traced MB per stage, plus an insights digest."""
+    results, timings = {}, {}
+    for name, fn in stages(path):
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            results[name] = fn(results)
+            best = min(best, time.perf_counter() - start)
+        timings[name] = {'seconds': best}
+
+    for name, fn in stages(path):
+        tracemalloc.start()
+        fn(results)
+        timings[name]['peak_mb'] = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+
+    digest = hashlib.sha256(vw.dumps_json(results['end_to_end'])).hexdigest()
+    return timings, digest
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--people', type=int, default=40)
+    parser.add_argument('--emoji-rate', type=float, default=0.3)
+    parser.add_argument('--pingpong-rate', type=float, default=0.1)
+    parser.add_argument('--raw', action='store_true', help='benchmark the raw statement layout')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--save-baseline', metavar='FILE')
+    parser.add_argument('--baseline', metavar='FILE')
+    parser.add_argument('--tolerance', type=float, default=1.25,
+                        help='slowdown ratio against the baseline that counts as a regression')
+    parser.add_argument('--min-seconds', type=float, default=0.005,
+                        help='ignore regressions on stages faster than this in the baseline')
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    report, failures = {}, []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in args.rows:
+            path = os.path.join(tmp, f'statement_{n_rows}.csv')
+            write_statement(path, n_rows, n_people=args.people, emoji_rate=args.emoji_rate,
+                            pingpong_rate=args.pingpong_rate, raw=args.raw)
+            timings, digest = measure(path, args.repeat)
+            key = f'{n_rows}{"-raw" if args.raw else ""}'
+            report[key] = {'digest': digest, 'stages': timings}
+
+            previous = baseline.get(key, {})
+            print(f'\n{key} rows')
+            print(f"{'stage':<28} {'seconds':>9} {'peak MB':>9} {'vs base':>8}")
+            for name, timing in timings.items():
+                base = previous.get('stages', {}).get(name)
+                ratio = timing['seconds'] / base['seconds'] if base and base['seconds'] else None
+                print(f"{name:<28} {timing['seconds']:>9.4f} {timing['peak_mb']:>9.1f} "
+                      f"{f'{ratio:.2f}x' if ratio else '-':>8}")
+                if ratio and ratio > args.tolerance and base['seconds'] >= args.min_seconds:
+                    failures.append(f'{key}: {name} is {ratio:.2f}x the baseline')
+            if previous and previous['digest'] != digest:
+                failures.append(f'{key}: insights differ from the baseline')
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+    for failure in failures:
+        print(f'FAIL: {failure}', file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""Memory of the compact payments frame against the old object-column layout.
+
+Writes synthetic statements with synth.py and loads each twice: with
+load_payments, and the way it used to be (normalized strings, float amounts,
+int64 month and hour, day names and Type kept). Prints the frame's deep size
+and the peak traced memory while loading for both, and checks the two frames
+hold the same payments.
+
+    python benchmarks/bench_memory.py [--rows 100000 1000000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import venmo_wrapped as vw
+from synth import write_statement
+
+def load_wide(path):
+    """The payments frame as it was before compact_payments."""
+    header_row, _ = vw.sniff_header(path)
+    chunks = []
+    for chunk in pd.read_csv(path, skiprows=header_row, usecols=lambda col: col in vw.USED_COLUMNS,
+                             dtype=str, chunksize=vw.CSV_CHUNK_ROWS):
+        chunk = vw.normalize_transactions(chunk.dropna(subset=['ID']))
+        chunks.append(chunk[chunk['Type'] == 'Payment'])
+    df = pd.concat(chunks)
+    return df.astype({'Month': np.int64, 'Hour': np.int64, 'DayOfWeek': object})
+
+def measure(load, path):
+    """Load once for time and once more under tracemalloc for the peak."""
+    start = time.perf_counter()
+    load(path)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    df = load(path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return df, elapsed, peak
+
+def check_same(wide, compact):
+    assert len(wide) == len(compact)
+    np.testing.assert_array_equal(wide['Amount'].to_numpy(), compact['Cents'].to_numpy() / vw.CENTS)
+    for column in ['Datetime', 'Note', 'Month', 'Hour']:
+        pd.testing.assert_series_equal(wide[column], compact[column], check_dtype=False)
+    for column in ['From', 'To', 'DayOfWeek', 'ID']:
+        np.testing.assert_array_equal(wide[column].to_numpy(dtype=object).astype(str),
+                                      compact[column].to_numpy(dtype=object).astype(str))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--people', type=int, default=40)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'layout':>8} {'frame MB':>9} {'peak MB':>9} {'load s':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in args.rows:
+            path = os.path.join(tmp, f'statement_{n_rows}.csv')
+            write_statement(path, n_rows, n_people=args.people)
+            frames = {}
+            for layout, load in (('wide', load_wide), ('compact', vw.load_payments)):
+                df, elapsed, peak = measure(load, path)
+                frames[layout] = df
+                size = df.memory_usage(deep=True).sum()
+                print(f'{n_rows:>10} {layout:>8} {size / 2**20:>9.1f} {peak / 2**20:>9.1f} {elapsed:>7.2f}')
+            check_same(frames['wide'], frames['compact'])
+
+if __name__ == '__main__':
+    main()
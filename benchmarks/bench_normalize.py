@@ -0,0 +1,63 @@
+"""Benchmark amount and datetime normalization against the per-cell version.
+
+Times normalize_transactions on raw string columns as read from a statement
+and compares it with the old path (clean_amount through .apply plus format
+inference in pd.to_datetime), checking both produce the same frame.
+
+    python benchmarks/bench_normalize.py [--sizes 100000 1000000]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from venmo_wrapped import clean_amount, normalize_transactions
+
+def make_raw_columns(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    cents = rng.integers(1, 500_000, n_rows)
+    signs = np.where(rng.random(n_rows) < 0.6, '-', '+')
+    amounts = [f'{sign} ${c / 100:,.2f}' for sign, c in zip(signs, cents)]
+    seconds = rng.integers(0, 365 * 24 * 3600, n_rows)
+    datetimes = (pd.Timestamp('2024-01-01') + pd.to_timedelta(seconds, unit='s')).strftime('%Y-%m-%dT%H:%M:%S')
+    return pd.DataFrame({'Datetime': datetimes.astype(object), 'Amount (total)': amounts})
+
+def per_cell_normalize(df):
+    """The original normalization, kept here as the baseline."""
+    df['Amount'] = df.pop('Amount (total)').apply(clean_amount)
+    df['Datetime'] = pd.to_datetime(df['Datetime'])
+    df['Month'] = df['Datetime'].dt.month
+    df['Hour'] = df['Datetime'].dt.hour
+    df['DayOfWeek'] = df['Datetime'].dt.day_name()
+    return df
+
+def best_of(fn, raw, repeat):
+    times = []
+    for _ in range(repeat):
+        df = raw.copy()
+        start = time.perf_counter()
+        result = fn(df)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'per-cell s':>11} {'vectorized s':>13} {'speedup':>8}")
+    for n_rows in args.sizes:
+        raw = make_raw_columns(n_rows)
+        old_time, old = best_of(per_cell_normalize, raw, args.repeat)
+        new_time, new = best_of(normalize_transactions, raw, args.repeat)
+        # The weekday is categorical now; compare the day names
+        pd.testing.assert_frame_equal(old, new.astype({'DayOfWeek': object}), check_dtype=False)
+        print(f'{n_rows:>10} {old_time:>11.3f} {new_time:>13.3f} {old_time / new_time:>7.1f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Wall-clock speedup of parallel analysis passes over serial ones.
+
+Loads synthetic statements written with synth.py, then times
+AnalysisState.from_frame serially and with the thread and process modes at
+each worker count, checking every mode builds the same insights. The speedup
+depends on the cores available; on a single core expect none.
+
+    python benchmarks/bench_parallel.py [--rows 300000 1000000] [--workers 2 4]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import venmo_wrapped as vw
+from synth import write_statement
+
+def best_of(df, parallel, workers, repeat):
+    best, insights = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        state = vw.AnalysisState.from_frame(df, parallel=parallel, workers=workers)
+        best = min(best, time.perf_counter() - start)
+        insights = vw.dumps_json(vw.to_native(state.insights()))
+    return best, insights
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[300_000, 1_000_000])
+    parser.add_argument('--workers', type=int, nargs='+', default=[2, 4])
+    parser.add_argument('--repeat', type=int, default=2)
+    args = parser.parse_args()
+
+    # Build the emoji matcher up front so the first timed run doesn't pay for it
+    vw.warm_worker()
+    print(f'{os.cpu_count()} CPUs')
+    print(f"{'rows':>10} {'mode':>8} {'workers':>8} {'seconds':>9} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in args.rows:
+            path = os.path.join(tmp, f'statement_{n_rows}.csv')
+            write_statement(path, n_rows)
+            df = vw.load_payments(path)
+            serial_time, expected = best_of(df, 'serial', 1, args.repeat)
+            print(f"{n_rows:>10} {'serial':>8} {1:>8} {serial_time:>9.3f} {'1.00x':>8}")
+            for parallel in ['thread', 'process']:
+                for workers in args.workers:
+                    elapsed, insights = best_of(df, parallel, workers, args.repeat)
+                    assert insights == expected, f'{parallel} x{workers} differs from serial at {n_rows} rows'
+                    print(f'{n_rows:>10} {parallel:>8} {workers:>8} {elapsed:>9.3f} {serial_time / elapsed:>7.2f}x')
+
+if __name__ == '__main__':
+    main()
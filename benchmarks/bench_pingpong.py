@@ -0,0 +1,87 @@
+"""Scaling benchmark for the money_pingpong section.
+
+Builds synthetic payment frames of growing size, checks the result against the
+old nested-iterrows implementation on the small sizes and prints the time per
+row so near-linear scaling is easy to eyeball.
+
+    python benchmarks/bench_pingpong.py [--sizes 1000 10000 100000] [--people 200]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import venmo_wrapped as vw
+
+ME = 'Me'
+
+def make_payments(n_rows, n_people, seed=0):
+    """Payments with both the float Amount the reference reads and the Cents load_payments keeps."""
+    rng = np.random.default_rng(seed)
+    people = np.array([f'Friend {i}' for i in range(n_people)], dtype=object)
+    partner = people[rng.integers(0, n_people, n_rows)]
+    outgoing = rng.random(n_rows) < 0.6
+    # Round to cents and round-trip nearby amounts so matches actually happen
+    amount = np.round(rng.choice([5.0, 12.5, 20.0, 45.0], n_rows) + rng.uniform(-1.5, 1.5, n_rows), 2)
+    seconds = rng.integers(0, 365 * 24 * 3600, n_rows)
+    return pd.DataFrame({
+        'Datetime': pd.Timestamp('2024-01-01') + pd.to_timedelta(seconds, unit='s'),
+        'Amount': np.where(outgoing, -amount, amount),
+        'Cents': np.rint(np.where(outgoing, -amount, amount) * 100).astype(np.int64),
+        'From': np.where(outgoing, ME, partner),
+        'To': np.where(outgoing, partner, ME),
+        'Note': np.where(rng.random(n_rows) < 0.05, None, 'note'),
+    })
+
+def money_pingpong(df):
+    return vw.get_money_pingpong(vw.AnalysisState.from_frame(df, ['money_pingpong']))
+
+def reference_pingpong(df):
+    """The original O(n*m) implementation, kept here to check equivalence."""
+    matches = []
+    outgoing = df[df['Amount'] < 0]
+    incoming = df[df['Amount'] > 0]
+    for _, out_row in outgoing.iterrows():
+        if pd.isna(out_row['From']) or pd.isna(out_row['To']) or pd.isna(out_row['Note']):
+            continue
+        person_incoming = incoming[incoming['From'] == out_row['To']]
+        out_amount = abs(out_row['Amount'])
+        for _, in_row in person_incoming.iterrows():
+            if pd.isna(in_row['Note']) or abs(out_amount - in_row['Amount']) > 1:
+                continue
+            time_diff = abs((in_row['Datetime'] - out_row['Datetime']).days)
+            if time_diff <= 7:
+                matches.append({
+                    'person': out_row['To'],
+                    'amount': out_amount,
+                    'note1': out_row['Note'],
+                    'note2': in_row['Note'],
+                    'time_diff': time_diff
+                })
+                break
+    return sorted(matches, key=lambda x: x['amount'], reverse=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 1000000])
+    parser.add_argument('--people', type=int, default=200)
+    parser.add_argument('--check-up-to', type=int, default=2000,
+                        help='compare against the reference implementation up to this many rows')
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'matches':>9} {'seconds':>9} {'us/row':>8}")
+    for n_rows in args.sizes:
+        df = make_payments(n_rows, args.people)
+        start = time.perf_counter()
+        matches = money_pingpong(df)
+        elapsed = time.perf_counter() - start
+        if n_rows <= args.check_up_to:
+            assert matches == reference_pingpong(df), f'mismatch against reference at {n_rows} rows'
+        print(f'{n_rows:>10} {len(matches):>9} {elapsed:>9.3f} {elapsed / n_rows * 1e6:>8.2f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Re-analyzing the same statement with and without the result cache.
+
+Writes synthetic statements with synth.py and times analyze_venmo_statement
+on each three ways: with no result cache, served from the in-process LRU,
+and served from the on-disk store by a fresh cache (as a new process would
+be). A hit still hashes the file, so the hash time is printed too. Checks
+every cached result matches the computed one.
+
+    python benchmarks/bench_result_cache.py [--rows 10000 100000 1000000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import venmo_wrapped as vw
+from synth import write_statement
+
+def best_of(repeat, run):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'file MB':>8} {'compute ms':>11} {'memory ms':>10} {'disk ms':>8} {'hash ms':>8} "
+          f"{'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = vw.ResultStore(os.path.join(tmp, 'results'))
+        for n_rows in args.rows:
+            path = os.path.join(tmp, f'statement_{n_rows}.csv')
+            write_statement(path, n_rows)
+            compute_time, expected = best_of(1, lambda: vw.analyze_venmo_statement(path, results=False))
+            expected = vw.dumps_json(expected)
+
+            memory = vw.ResultCache(store=store)
+            vw.analyze_venmo_statement(path, results=memory)
+            memory_time, cached = best_of(args.repeat, lambda: vw.analyze_venmo_statement(path, results=memory))
+            assert vw.dumps_json(cached) == expected
+            # A new cache per run, so every hit is read back from disk
+            disk_time, cached = best_of(args.repeat, lambda: vw.analyze_venmo_statement(
+                path, results=vw.ResultCache(store=store)))
+            assert vw.dumps_json(cached) == expected
+            hash_time, _ = best_of(args.repeat, lambda: vw.file_content_hash(path))
+
+            print(f'{n_rows:>10} {os.path.getsize(path) / 2**20:>8.1f} {compute_time * 1e3:>11.1f} '
+                  f'{memory_time * 1e3:>10.2f} {disk_time * 1e3:>8.2f} {hash_time * 1e3:>8.2f} '
+                  f'{compute_time / disk_time:>7.0f}x')
+
+if __name__ == '__main__':
+    main()
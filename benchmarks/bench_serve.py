@@ -0,0 +1,107 @@
+"""Load test for --serve against one process per request.
+
+Writes a handful of synthetic statements with synth.py, then sends the same stream of
+requests two ways: `python venmo_wrapped.py <csv>` per request (what the web
+app does today) and a warm `--serve --socket` server. Prints p50/p99 latency
+and throughput for both at the given client concurrency.
+
+    python benchmarks/bench_serve.py [--requests 200] [--concurrency 4] [--rows 2000]
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from synth import write_statement
+
+SCRIPT = Path(__file__).resolve().parent.parent / 'venmo_wrapped.py'
+
+def per_process(csv_path):
+    subprocess.run([sys.executable, '-W', 'ignore', str(SCRIPT), csv_path], capture_output=True, check=True)
+
+class SocketClient:
+    def __init__(self, socket_path):
+        self.sock = socket.socket(socket.AF_UNIX)
+        self.sock.connect(socket_path)
+        self.stream = self.sock.makefile('rwb')
+
+    def __call__(self, csv_path):
+        self.stream.write(json.dumps({'file': csv_path}).encode() + b'\n')
+        self.stream.flush()
+        response = json.loads(self.stream.readline())
+        assert response.get('success'), response
+
+def run_load(send, paths, n_requests, concurrency):
+    """Send n_requests round-robin over paths; returns (latencies, wall seconds)."""
+    def timed(i):
+        start = time.perf_counter()
+        send(i, paths[i % len(paths)])
+        return time.perf_counter() - start
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as clients:
+        latencies = list(clients.map(timed, range(n_requests)))
+    return np.array(latencies), time.perf_counter() - start
+
+def report(name, latencies, wall):
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    print(f'{name:<14} {p50:>9.1f} {p99:>9.1f} {len(latencies) / wall:>9.1f}')
+
+def wait_for_socket(socket_path, timeout=30):
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(socket_path):
+        if time.monotonic() > deadline:
+            raise RuntimeError('server did not start')
+        time.sleep(0.05)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--rows', type=int, default=2000, help='transactions per statement')
+    parser.add_argument('--statements', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for seed in range(args.statements):
+            paths.append(os.path.join(tmp, f'statement_{seed}.csv'))
+            write_statement(paths[-1], args.rows, seed)
+
+        print(f"{'model':<14} {'p50 ms':>9} {'p99 ms':>9} {'req/s':>9}")
+        latencies, wall = run_load(lambda i, path: per_process(path), paths, args.requests, args.concurrency)
+        report('per-process', latencies, wall)
+
+        socket_path = os.path.join(tmp, 'serve.sock')
+        # With the result cache off, so repeats of a statement are analyzed again
+        server = subprocess.Popen([sys.executable, '-W', 'ignore', str(SCRIPT), '--serve',
+                                   '--socket', socket_path, '-j', str(args.workers)],
+                                  env={**os.environ, 'VENMO_WRAPPED_RESULT_CACHE_ENTRIES': '0'})
+        try:
+            wait_for_socket(socket_path)
+            local = threading.local()
+            def send(i, path):
+                # Each client thread keeps its own connection
+                if not hasattr(local, 'client'):
+                    local.client = SocketClient(socket_path)
+                local.client(path)
+            # One pass to warm the workers, as a long-running server would be
+            run_load(send, paths, args.concurrency, args.concurrency)
+            latencies, wall = run_load(send, paths, args.requests, args.concurrency)
+            report('serve (socket)', latencies, wall)
+        finally:
+            server.send_signal(signal.SIGINT)
+            server.wait()
+
+if __name__ == '__main__':
+    main()
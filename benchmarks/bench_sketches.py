@@ -0,0 +1,58 @@
+"""Exact against approximate (sketched) analysis states.
+
+Writes synthetic statements with synth.py using many counterparties, then builds
+the fun and social sections' AnalysisState with and without approximate=True.
+For each it prints the build time and the saved state's size, followed by the
+unique-people count, network size and most repeated note from both modes. The
+sketched note count is checked against the sketch's error bound.
+
+    python benchmarks/bench_sketches.py [--rows 100000 1000000] [--people 200000]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import venmo_wrapped as vw
+from synth import write_statement
+
+SECTIONS = ['fun_insights', 'social_insights']
+
+def build(df, approximate):
+    start = time.perf_counter()
+    state = vw.AnalysisState.from_frame(df, SECTIONS, approximate=approximate)
+    elapsed = time.perf_counter() - start
+    return state, elapsed, len(json.dumps(state.to_dict()))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--people', type=int, default=200_000)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'mode':>7} {'seconds':>8} {'state KB':>9} {'people':>8} {'network':>8}  most repeated note")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in args.rows:
+            path = os.path.join(tmp, f'statement_{n_rows}.csv')
+            write_statement(path, n_rows, n_people=args.people)
+            df = vw.load_payments(path)
+            for approximate in (False, True):
+                state, elapsed, size = build(df, approximate)
+                insights = state.insights()
+                social, repeated = insights['social_insights'], insights['fun_insights']['note_stats']['most_repeated']
+                print(f"{n_rows:>10} {'approx' if approximate else 'exact':>7} {elapsed:>8.3f} {size / 1024:>9.1f} "
+                      f"{social['total_unique_people']:>8} {social['payment_network_size']:>8}  "
+                      f"{repeated['note']!r} x{repeated['count']}")
+                if approximate:
+                    sketch = state.note_sketch
+                    count = exact.note_counts[repeated['note']]
+                    assert repeated['count'] - sketch.errors[repeated['note']] <= count <= repeated['count']
+                else:
+                    exact = state
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Cold-start check for the CLI entry point.
+
+Times `import venmo_wrapped` and the `python venmo_wrapped.py` usage path in
+fresh interpreters, checks that the plotting and emoji libraries are not
+loaded on import, and exits non-zero when the median import time is over the
+budget so it can gate CI.
+
+    python benchmarks/bench_startup.py [--budget 0.7] [--runs 5]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+# pandas imports pyarrow itself, but not the CSV reader or Feather
+DEFERRED_MODULES = ['matplotlib', 'PIL', 'emoji', 'orjson', 'pyarrow.csv', 'pyarrow.feather']
+
+IMPORT_PROBE = f"""
+import json, sys, time
+sys.path.insert(0, {str(ROOT)!r})
+start = time.perf_counter()
+import venmo_wrapped
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {DEFERRED_MODULES!r} if m in sys.modules]}}))
+"""
+
+def probe_import():
+    out = subprocess.run([sys.executable, '-W', 'ignore', '-c', IMPORT_PROBE],
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out)
+
+def time_cli():
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-W', 'ignore', str(ROOT / 'venmo_wrapped.py')], capture_output=True)
+    return time.perf_counter() - start
+
+def time_bare_interpreter():
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'pass'], capture_output=True)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget', type=float, default=0.7, help='maximum median import time in seconds')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    probes = [probe_import() for _ in range(args.runs)]
+    import_time = statistics.median(p['seconds'] for p in probes)
+    cli_time = statistics.median(time_cli() for _ in range(args.runs))
+    bare_time = statistics.median(time_bare_interpreter() for _ in range(args.runs))
+    loaded = sorted({m for p in probes for m in p['loaded']})
+
+    print(f'{"bare interpreter":<20} {bare_time:>7.3f} s')
+    print(f'{"import venmo_wrapped":<20} {import_time:>7.3f} s  (budget {args.budget:.3f} s)')
+    print(f'{"CLI usage path":<20} {cli_time:>7.3f} s')
+
+    failures = []
+    if loaded:
+        failures.append(f'deferred modules loaded on import: {", ".join(loaded)}')
+    if import_time > args.budget:
+        failures.append(f'import took {import_time:.3f} s, over the {args.budget:.3f} s budget')
+    for failure in failures:
+        print(f'FAIL: {failure}', file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
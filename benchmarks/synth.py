@@ -0,0 +1,139 @@
+"""Deterministic synthetic Venmo statements for benchmarks.
+
+Writes statements in the official layout (two title rows above the header, a
+balance row under it and a disclaimer row at the end, which is what the
+analyzer's skiprows=2 sniffing handles) or the raw layout (header first).
+Rows are generated a chunk at a time with numpy, so 10M-row statements stream
+to disk without holding them in memory. The same arguments always write the
+same bytes.
+
+    python benchmarks/synth.py out.csv [--rows 100000] [--people 40] [--emoji-rate 0.3]
+                                       [--pingpong-rate 0.1] [--raw] [--seed 0]
+"""
+import argparse
+import csv
+
+import numpy as np
+import pandas as pd
+
+HEADER = ['', 'ID', 'Datetime', 'Type', 'Status', 'Note', 'From', 'To', 'Amount (total)', 'Amount (tip)',
+          'Amount (tax)', 'Amount (fee)', 'Tax Rate', 'Tax Exempt', 'Funding Source', 'Destination',
+          'Beginning Balance', 'Ending Balance', 'Statement Period Venmo Fees', 'Terminal Location',
+          'Year to Date Venmo Fees', 'Disclaimer']
+ME = 'Me Myself'
+FIRST_ID = 3_000_000_000
+START = np.datetime64('2024-01-01T00:00:00', 's')
+CHUNK_ROWS = 200_000
+
+# Notes cover every category keyword plus plain ones, so all insights fire
+NOTES = np.array([
+    'lunch', 'dinner', 'food', 'groceries', 'restaurant', 'drinks', 'bar tab', 'beer run', 'wine night',
+    'rent', 'utilities', 'wifi', 'electric bill', 'gas bill', 'water', 'uber home', 'lyft', 'taxi',
+    'train', 'bus pass', 'movie tickets', 'concert', 'party', 'club', 'show', 'game night',
+    'amazon order', 'shopping', 'clothes', 'store run', 'hotel', 'flight', 'airbnb', 'trip',
+    'vacation', 'thanks', 'for the thing', 'misc', 'coffee', 'x', 'birthday gift',
+    'split for the long weekend cabin with everyone from the group chat',
+], dtype=object)
+EMOJIS = np.array(['🍕', '🧋', '🎉', '🍺', '✈️', '🎁', '🔥', '😂', '👍🏽', '👨‍👩‍👧', '🇺🇸', '❤️'], dtype=object)
+TYPES = np.array(['Payment', 'Charge', 'Standard Transfer'], dtype=object)
+TYPE_WEIGHTS = [0.85, 0.1, 0.05]
+# Mostly everyday amounts, a tail of rent-sized ones and a few tiny ones
+AMOUNT_BANDS_CENTS = [(100, 5_000), (5_000, 90_000), (1, 100), (100_000, 250_000)]
+AMOUNT_BAND_WEIGHTS = [0.6, 0.3, 0.07, 0.03]
+EMPTY_NOTE_RATE = 0.03
+
+def format_amounts(cents, outgoing):
+    signs = np.where(outgoing, '- $', '+ $')
+    return [f'{sign}{c / 100:,.2f}' for sign, c in zip(signs, cents.tolist())]
+
+def make_notes(rng, n_rows, emoji_rate):
+    notes = NOTES[rng.integers(len(NOTES), size=n_rows)]
+    with_emoji = rng.random(n_rows) < emoji_rate
+    notes[with_emoji] = notes[with_emoji] + ' ' + EMOJIS[rng.integers(len(EMOJIS), size=with_emoji.sum())]
+    # A second emoji now and then gives the emoji pair stats something to count
+    doubled = with_emoji & (rng.random(n_rows) < 0.2)
+    notes[doubled] = notes[doubled] + EMOJIS[rng.integers(len(EMOJIS), size=doubled.sum())]
+    notes[rng.random(n_rows) < EMPTY_NOTE_RATE] = ''
+    return notes
+
+def make_chunk(rng, first_id, n_rows, window, people, emoji_rate, pingpong_rate):
+    """One time-ordered chunk of rows as a frame in HEADER order.
+
+    `window` is the (start, end) second offset the chunk's times fall in. A
+    pingpong_rate share of rows gets a payment back from (or to) the same
+    person within ten days for about the same amount.
+    """
+    partner = people[rng.integers(len(people), size=n_rows)]
+    outgoing = rng.random(n_rows) < 0.6
+    band = rng.choice(len(AMOUNT_BANDS_CENTS), size=n_rows, p=AMOUNT_BAND_WEIGHTS)
+    low, high = np.array(AMOUNT_BANDS_CENTS).T
+    cents = rng.integers(low[band], high[band])
+    seconds = rng.integers(window[0], window[1], size=n_rows)
+    types = TYPES[rng.choice(len(TYPES), size=n_rows, p=TYPE_WEIGHTS)]
+
+    back = np.flatnonzero(rng.random(n_rows) < pingpong_rate)
+    partner = np.concatenate([partner, partner[back]])
+    outgoing = np.concatenate([outgoing, ~outgoing[back]])
+    cents = np.concatenate([cents, np.maximum(cents[back] + rng.integers(-150, 151, size=len(back)), 1)])
+    seconds = np.concatenate([seconds, seconds[back] + rng.integers(0, 10 * 86_400, size=len(back))])
+    types = np.concatenate([types, np.full(len(back), 'Payment', dtype=object)])
+
+    order = np.argsort(seconds, kind='stable')
+    n_total = len(order)
+    partner, outgoing, cents, seconds, types = (a[order] for a in (partner, outgoing, cents, seconds, types))
+    chunk = pd.DataFrame({column: '' for column in HEADER}, index=range(n_total))
+    chunk['ID'] = np.arange(first_id, first_id + n_total).astype(str)
+    chunk['Datetime'] = (START + seconds.astype('timedelta64[s]')).astype(str)
+    chunk['Type'] = types
+    chunk['Status'] = 'Complete'
+    chunk['Note'] = make_notes(rng, n_total, emoji_rate)
+    chunk['From'] = np.where(outgoing, ME, partner)
+    chunk['To'] = np.where(outgoing, partner, ME)
+    chunk['Amount (total)'] = format_amounts(cents, outgoing)
+    for column in ['Amount (tip)', 'Amount (tax)', 'Amount (fee)']:
+        chunk[column] = '0'
+    chunk['Funding Source'] = 'Venmo balance'
+    return chunk
+
+def write_statement(path, n_rows, seed=0, n_people=40, emoji_rate=0.3, pingpong_rate=0.1,
+                    raw=False, days=365, chunk_rows=CHUNK_ROWS):
+    """Write a synthetic statement of about n_rows transactions (plus pingpong returns)."""
+    rng = np.random.default_rng(seed)
+    people = np.array([f'Friend {i}' for i in range(n_people)], dtype=object)
+    n_chunks = max(1, -(-n_rows // chunk_rows))
+    span = days * 86_400
+    blank = [''] * (len(HEADER) - 1)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        if not raw:
+            writer.writerow([f'Account Statement - (@{ME.replace(" ", "-")}) '] + blank)
+            writer.writerow(['Account Activity'] + blank)
+        writer.writerow(HEADER)
+        if not raw:
+            writer.writerow(blank[:16] + ['$0.00'] + blank[16:])
+        next_id = FIRST_ID
+        for i in range(n_chunks):
+            size = min(chunk_rows, n_rows - i * chunk_rows)
+            window = (span * i // n_chunks, span * (i + 1) // n_chunks)
+            chunk = make_chunk(rng, next_id, size, window, people, emoji_rate, pingpong_rate)
+            next_id += len(chunk)
+            chunk.to_csv(f, header=False, index=False)
+        if not raw:
+            writer.writerow(blank[:16] + ['', '$12.00', '$0.00', '', '$0.00', 'In case of errors'])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path')
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--people', type=int, default=40, help='number of counterparties')
+    parser.add_argument('--emoji-rate', type=float, default=0.3, help='share of notes with an emoji')
+    parser.add_argument('--pingpong-rate', type=float, default=0.1, help='share of payments that get paid back')
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--raw', action='store_true', help='write the raw layout with the header first')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    write_statement(args.path, args.rows, args.seed, args.people, args.emoji_rate, args.pingpong_rate,
+                    args.raw, args.days)
+
+if __name__ == '__main__':
+    main()
@@ -158,6 +158,22 @@ interface DebtCycle {
   };
 }
 
+interface PaymentNetwork {
+  people: number;
+  payment_links: number;
+  groups: number;
+  largest_group: number;
+  circular_payments: {
+    people: string[];
+    amount: Amount;
+  }[];
+  netting: {
+    total_paid: Amount;
+    after_pairwise_netting: Amount;
+    minimum_to_settle: Amount;
+  };
+}
+
 interface FunInsights {
   most_used_emoji: {
     emoji: string;
@@ -200,6 +216,7 @@ interface VenmoInsights {
   social_insights: SocialInsights;
   money_pingpong: MoneyPingpong[];
   eternal_debt_cycles: DebtCycle[];
+  payment_network?: PaymentNetwork;
 }
 
 // Helper functions
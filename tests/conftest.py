@@ -0,0 +1,41 @@
+import os
+import sys
+import warnings
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+from synth import write_statement
+
+# Few people and a short span, so ties in the counts and picks are common
+SMALL_STATEMENT = {'n_people': 6, 'days': 90}
+
+@pytest.fixture(autouse=True)
+def quiet_pandas():
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        yield
+
+@pytest.fixture(autouse=True)
+def no_env_settings(monkeypatch):
+    """Run every test with the analysis defaults, whatever the shell has set."""
+    for name in list(os.environ):
+        if name.startswith('VENMO_WRAPPED_'):
+            monkeypatch.delenv(name)
+
+@pytest.fixture(scope='session')
+def statements(tmp_path_factory):
+    """Small synthetic statements, both layouts, written once per session."""
+    directory = tmp_path_factory.mktemp('statements')
+    paths = []
+    for seed in range(4):
+        paths.append(str(directory / f'statement_{seed}.csv'))
+        write_statement(paths[-1], 300 + 100 * seed, seed=seed, raw=seed % 2 == 1, **SMALL_STATEMENT)
+    return paths
+
+@pytest.fixture(scope='session')
+def statement(statements):
+    return statements[0]
@@ -0,0 +1,79 @@
+"""Insights against the output of the original per-row code.
+
+baseline_insights.json holds what the baseline commit's
+analyze_venmo_statement returned for a few synthetic statements, with the
+write_statement arguments that made each one. The current code must give
+the same answer, apart from these documented changes:
+
+- spending_overview.monthly_spend is new (user-021).
+- people_insights.most_thankful_friend.count was negated; it is now positive (user-007).
+- Emojis are whole sequences rather than codepoints, which changes
+  most_used_emoji, favorite_emoji_combo and note_stats.emoji_percentage (user-008).
+- creative_notes that tie on length come earliest row first (user-012).
+- most_active_day, most_active_hour and most_repeated break ties by first
+  appearance instead of pandas' unstable sort, so only their counts are
+  compared here (user-012); test_ties_go_to_the_first_seen checks the picks.
+- Sums are exact in cents, so floats can differ in the last digit.
+"""
+import json
+
+import pytest
+
+import venmo_wrapped as vw
+from conftest import ROOT
+from synth import write_statement
+
+BASELINE = json.loads((ROOT / 'tests' / 'baseline_insights.json').read_text(encoding='utf-8'))
+
+def without_changes(insights):
+    """`insights` with the documented changes taken out."""
+    insights = json.loads(vw.dumps_json(insights))
+    insights['spending_overview'].pop('monthly_spend', None)
+    thankful = insights['people_insights']['most_thankful_friend']
+    thankful['count'] = abs(thankful['count'])
+    fun, time = insights['fun_insights'], insights['time_insights']
+    for key in ['most_used_emoji', 'favorite_emoji_combo']:
+        fun.pop(key)
+    fun['note_stats'].pop('emoji_percentage')
+    fun['creative_notes'] = sorted(len(note['note']) for note in fun['creative_notes'])
+    fun['note_stats']['most_repeated'].pop('note')
+    time['most_active_day'].pop('day')
+    time['most_active_hour'].pop('hour')
+    return insights
+
+def assert_close(got, expected, path=''):
+    if isinstance(expected, dict):
+        assert sorted(got) == sorted(expected), path
+        for key in expected:
+            assert_close(got[key], expected[key], f'{path}.{key}')
+    elif isinstance(expected, list):
+        assert len(got) == len(expected), path
+        for i, (a, b) in enumerate(zip(got, expected)):
+            assert_close(a, b, f'{path}[{i}]')
+    elif isinstance(expected, float):
+        assert got == pytest.approx(expected, rel=1e-9, nan_ok=True), path
+    else:
+        assert got == expected, path
+
+@pytest.mark.parametrize('case', BASELINE, ids=lambda case: f"{case['statement']['n_rows']}-{case['statement']['seed']}")
+def test_matches_the_baseline(tmp_path, case):
+    path = str(tmp_path / 'statement.csv')
+    write_statement(path, **case['statement'])
+    got = vw.analyze_venmo_statement(path, results=False)
+    assert_close(without_changes(got), without_changes(case['insights']))
+
+def first_of_most(values):
+    """The most frequent of `values`, ties going to the first seen."""
+    counts = values.value_counts(sort=False)
+    return counts.index[(counts == counts.max()).to_numpy()][0]
+
+@pytest.mark.parametrize('seed', range(40))
+def test_ties_go_to_the_first_seen(tmp_path, seed):
+    # A dozen payments over a few days tie often
+    path = str(tmp_path / 'tiny.csv')
+    write_statement(path, 12, seed=seed, n_people=3, days=4)
+    df = vw.load_payments(path)
+    insights = vw.analyze_venmo_statement(path, results=False)
+    assert insights['time_insights']['most_active_day']['day'] == first_of_most(df['DayOfWeek'].astype(object))
+    assert insights['time_insights']['most_active_hour']['hour'] == first_of_most(df['Hour'])
+    assert insights['fun_insights']['note_stats']['most_repeated']['note'] == first_of_most(df['Note'])
@@ -0,0 +1,21 @@
+import os
+
+import pytest
+
+import venmo_wrapped as vw
+
+pytest.importorskip('matplotlib')
+pytest.importorskip('PIL')
+
+@pytest.mark.parametrize('sections, charts', [
+    (None, ['monthly_spend.png', 'categories.png']),
+    (['spending_overview'], ['monthly_spend.png']),
+    (['transaction_categories'], ['categories.png']),
+    (['people_insights'], []),
+])
+def test_charts_follow_the_sections(statement, tmp_path, sections, charts):
+    insights = vw.analyze_venmo_statement(statement, sections=sections, results=False)
+    output_dir = tmp_path / 'charts'
+    assert vw.generate_visualizations(insights, output_dir) == [str(output_dir / name) for name in charts]
+    written = os.listdir(output_dir) if output_dir.exists() else []
+    assert sorted(written) == sorted(charts)
@@ -0,0 +1,21 @@
+import json
+
+import pytest
+
+import venmo_wrapped as vw
+
+@pytest.mark.parametrize('argv', [
+    ['--bogus', 'a.csv'],
+    ['--range', 'not-a-range', 'a.csv'],
+    ['--parallel', 'fibers', 'a.csv'],
+    ['--sections', 'people_insights', '--batch', 'a.csv'],
+    ['--batch', '--workers', 'many', 'a.csv'],
+    ['--clear-cache', 'a.csv'],
+])
+def test_usage_errors_are_json(capsys, argv):
+    with pytest.raises(SystemExit) as exit_info:
+        vw.main(argv)
+    assert exit_info.value.code == 1
+    out, err = capsys.readouterr()
+    assert set(json.loads(out)) == {'error'}
+    assert not err
@@ -0,0 +1,11 @@
+import venmo_wrapped as vw
+
+def test_cohort_matches_each_statement_alone(statements, tmp_path):
+    broken = tmp_path / 'broken.csv'
+    broken.write_text('ID,Datetime,Type\n1,2024-01-01T00:00:00,Payment\n')
+    paths = [statements[0], str(broken), *statements[1:], str(tmp_path / 'missing.csv')]
+    results = vw.analyze_cohort(paths)
+    assert [result['file'] for result in results] == paths
+    for path, result in zip(paths, results):
+        single = vw.analyze_file(path, results=False)
+        assert vw.dumps_json(result) == vw.dumps_json(single), path
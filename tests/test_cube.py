@@ -0,0 +1,24 @@
+import random
+
+import numpy as np
+
+import venmo_wrapped as vw
+
+def test_cube_ranges_match_a_filtered_frame(statement):
+    df = vw.load_payments(statement)
+    cube = vw.AggregateCube.from_frame(df)
+    days = vw.payment_days(df)
+    timed = df['Datetime'].notna().to_numpy()
+    first, last = cube.days
+    rnd = random.Random(0)
+    ranges = [(None, None), (first, first), (last, last), (last + 1, last + 9)]
+    ranges += [tuple(sorted(rnd.sample(range(first - 5, last + 6), 2))) for _ in range(10)]
+    for start, end in ranges:
+        got = cube.insights(None if start is None else np.datetime64(start, 'D'),
+                            None if end is None else np.datetime64(end, 'D'))
+        start, end = first if start is None else start, last if end is None else end
+        state = vw.AnalysisState.from_frame(df[timed & (days >= start) & (days <= end)], vw.RANGE_SECTIONS)
+        expected = {"date_range": got["date_range"],
+                    "spending_overview": vw.get_spending_overview(state, vw.calendar_months(start, end))}
+        expected.update(state.insights(vw.RANGE_SECTIONS[1:]))
+        assert vw.dumps_json(got) == vw.dumps_json(expected), (start, end)
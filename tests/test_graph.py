@@ -0,0 +1,85 @@
+import itertools
+
+import numpy as np
+import pytest
+
+import venmo_wrapped as vw
+
+def best_cycle(edges):
+    """The largest smallest-edge over simple cycles of three or more people, by brute force."""
+    people = sorted({payer for payer, _ in edges} | {payee for _, payee in edges})
+    best = 0
+    for size in range(3, len(people) + 1):
+        for cycle in itertools.permutations(people, size):
+            if cycle[0] == min(cycle):
+                best = max(best, min(edges.get((cycle[i], cycle[(i + 1) % size]), 0) for i in range(size)))
+    return best
+
+def union_find(n_people, payer, payee):
+    parent = list(range(n_people))
+    def find(person):
+        while parent[person] != person:
+            parent[person] = parent[parent[person]]
+            person = parent[person]
+        return person
+    for a, b in zip(payer, payee):
+        root_a, root_b = find(a), find(b)
+        parent[max(root_a, root_b)] = min(root_a, root_b)
+    return [find(person) for person in range(n_people)]
+
+def chain_graph(n_links, cycle, seed=0):
+    """Person i + 1 pays person i down a chain, optionally feeding a three-person cycle, numbered at random."""
+    payer, payee = list(range(1, n_links + 1)), list(range(n_links))
+    if cycle:
+        payer += [n_links, n_links + 1, n_links + 2]
+        payee += [n_links + 1, n_links + 2, n_links]
+    people = np.random.default_rng(seed).permutation(n_links + 3)
+    names = np.empty(n_links + 3, dtype=object)
+    names[people] = [f'P{i:06d}' for i in range(n_links + 3)]
+    return vw.PaymentGraph(names, people[payer], people[payee], np.ones(len(payer), dtype=np.int64),
+                           np.full(len(payer), 500, dtype=np.int64))
+
+@pytest.mark.parametrize('seed', range(3))
+def test_small_graphs_match_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    for _ in range(150):
+        n, m = int(rng.integers(2, 7)), int(rng.integers(1, 16))
+        names = np.array([f'P{i}' for i in range(n)], dtype=object)
+        graph = vw.PaymentGraph.from_edges(vw.payment_edges(
+            names[rng.integers(0, n, m)], names[rng.integers(0, n, m)], rng.integers(-500, 500, m)))
+        netted = graph.netted
+        owed = {(netted.names[a], netted.names[b]): int(c)
+                for a, b, c in zip(netted.payer, netted.payee, netted.cents)}
+        cycles = graph.circular_payments(limit=1)
+        assert (cycles[0][1] if cycles else 0) == best_cycle(owed)
+        assert graph.components().tolist() == union_find(len(graph.names), graph.payer, graph.payee)
+        # Taking every cycle's amount off leaves nothing circular
+        for names_in_cycle, cents in graph.circular_payments(limit=100):
+            for payer, payee in zip(names_in_cycle, names_in_cycle[1:] + names_in_cycle[:1]):
+                owed[payer, payee] -= cents
+        assert best_cycle({edge: cents for edge, cents in owed.items() if cents > 0}) == 0
+
+@pytest.mark.parametrize('share', [0, 1])
+def test_cycle_core_peels_the_same_by_rounds_or_queue(monkeypatch, share):
+    # 0 never hands over to the queue, 1 always does
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        n, m = int(rng.integers(2, 60)), int(rng.integers(1, 80))
+        payer, payee = rng.integers(0, n, m), rng.integers(0, n, m)
+        edges = (payer != payee) & (rng.random(m) < 0.9)
+        monkeypatch.setattr(vw, 'PEEL_ROUND_SHARE', 0)
+        expected = vw._cycle_core(payer, payee, edges, n)
+        monkeypatch.setattr(vw, 'PEEL_ROUND_SHARE', share)
+        assert vw._cycle_core(payer, payee, edges, n).tolist() == expected.tolist()
+
+@pytest.mark.parametrize('cycle', [False, True])
+def test_long_chains(cycle):
+    # One peeling round or label hop per link would take minutes at this depth
+    graph = chain_graph(100_000, cycle)
+    # Without the cycle its three people are left on their own
+    assert len(np.unique(graph.components())) == (1 if cycle else 3)
+    cycles = graph.circular_payments()
+    if cycle:
+        assert cycles == [(['P100000', 'P100001', 'P100002'], 500)]
+    else:
+        assert cycles == []
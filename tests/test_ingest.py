@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+import venmo_wrapped as vw
+
+def insights(state):
+    return vw.dumps_json(vw.to_native(state.insights()))
+
+def reorder_rows(path, out_path, reorder):
+    """Copy a statement with its rows after the header put in `reorder(n_rows)` order."""
+    header_row, _ = vw.sniff_header(path)
+    with open(path, encoding='utf-8', newline='') as f:
+        lines = f.readlines()
+    head, rows = lines[:header_row + 1], lines[header_row + 1:]
+    with open(out_path, 'w', encoding='utf-8', newline='') as f:
+        f.writelines(head + [rows[i] for i in reorder(len(rows))])
+
+@pytest.mark.parametrize('chunksize', [60, 10_000])
+def test_folded_chunks_match_the_whole_frame(statements, chunksize):
+    for path in statements:
+        expected = insights(vw.AnalysisState.from_frame(vw.load_payments(path)))
+        assert insights(vw.fold_payment_chunks(path, chunksize=chunksize)) == expected, path
+
+def test_chunks_out_of_date_order(statement, tmp_path):
+    path = str(tmp_path / 'shuffled.csv')
+    # Newest first, every chunk reaches back into the one before, so they're summarized together
+    reorder_rows(statement, path, lambda n_rows: np.arange(n_rows)[::-1])
+    expected = insights(vw.AnalysisState.from_frame(vw.load_payments(path)))
+    assert insights(vw.fold_payment_chunks(path, chunksize=100)) == expected
+    # The first payment (after the opening balance row) moved to the end reaches
+    # back past merged rows, so folding gives up and the whole frame is analyzed
+    reorder_rows(statement, path, lambda n_rows: np.r_[0, 2:n_rows, 1])
+    assert vw.fold_payment_chunks(path, chunksize=100) is None
+    assert insights(vw.statement_state(path)) == insights(vw.AnalysisState.from_frame(vw.load_payments(path)))
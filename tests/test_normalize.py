@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import venmo_wrapped as vw
+
+def outcome(parse, cell):
+    try:
+        return 'value', parse(cell)
+    except ValueError:
+        return 'error', None
+
+def bulk(cell):
+    # A well-formed neighbour, so the cell decides whether the bulk path is taken
+    return float(vw.clean_amounts(pd.Series([cell, '- $1.00'], dtype=object)).iloc[0])
+
+def assert_same(cell):
+    want, got = outcome(vw.clean_amount, cell), outcome(bulk, cell)
+    assert want[0] == got[0], cell
+    if want[0] == 'value':
+        assert want[1] == got[1] or (np.isnan(want[1]) and np.isnan(got[1])), cell
+
+@pytest.mark.parametrize('cell', [
+    '+ $1,234.50', '- $1,234.50', '$0.00', '- $0.01', '+ $12', '12', '1.', '.5', '  - $3.25  ',
+    '++-4.4', '++ ,22', '+-+$ 0', '$ - 4', '- $1,234.50', '+-4', '1 000', '4-', '1.2.3', '.', '-', '',
+    '- $ 12', '+  $5', '$-5', '12345678901234567.5', '0.1234567890123456789', 'nan', 'inf'
+])
+def test_clean_amounts_matches_clean_amount(cell):
+    assert_same(cell)
+
+def test_clean_amounts_matches_clean_amount_on_random_cells():
+    rng = np.random.default_rng(0)
+    alphabet = list('0123456789.+- $,') + ['12', '4.4', '- $', '+ $', '0']
+    for _ in range(3000):
+        assert_same(''.join(rng.choice(alphabet, rng.integers(1, 7))))
+
+def test_clean_amounts_counts_missing_as_zero():
+    amounts = pd.Series(['+ $1.50', np.nan, '- $2,000.00', None], dtype=object, index=[3, 5, 7, 9])
+    expected = amounts.apply(vw.clean_amount).astype('float64')
+    pd.testing.assert_series_equal(vw.clean_amounts(amounts), expected)
+
+def test_parse_datetimes_reads_the_venmo_format_per_value():
+    datetimes = pd.Series(['2024-01-05T03:04:05', None, '2024-1-5T3:04:05', '2024-02-29T23:59:59'], dtype=object)
+    expected = pd.Series(pd.to_datetime(['2024-01-05 03:04:05', None, '2024-01-05 03:04:05', '2024-02-29 23:59:59']))
+    pd.testing.assert_series_equal(vw.parse_datetimes(datetimes), expected)
+
+@pytest.mark.parametrize('datetimes', [
+    ['2024-01-05 03:04:05', '2024-01-06 10:00:00'],
+    ['2024-01-05T03:04:05Z', '2024-01-06T10:00:00Z'],
+    ['2024-01-05T03:04:05.250', '2024-01-06T10:00:00']
+])
+def test_parse_datetimes_falls_back_for_other_exports(datetimes):
+    expected = pd.to_datetime(pd.Series(datetimes), format='ISO8601')
+    pd.testing.assert_series_equal(vw.parse_datetimes(pd.Series(datetimes, dtype=object)), expected)
@@ -0,0 +1,10 @@
+import pytest
+
+import venmo_wrapped as vw
+
+@pytest.mark.parametrize('parallel', ['thread', 'process'])
+def test_parallel_passes_match_serial(statement, parallel):
+    df = vw.load_payments(statement)
+    expected = vw.AnalysisState.from_frame(df, parallel='serial').insights()
+    got = vw.AnalysisState.from_frame(df, parallel=parallel, workers=2).insights()
+    assert vw.dumps_json(got) == vw.dumps_json(expected)
@@ -0,0 +1,27 @@
+import venmo_wrapped as vw
+
+def test_result_cache_is_off_by_default():
+    assert vw.ResultCache.from_env() is None
+
+def test_result_cache_hits_match_a_fresh_run(statement, tmp_path):
+    expected = vw.dumps_json(vw.analyze_venmo_statement(statement, results=False))
+    store = vw.ResultStore(tmp_path)
+    results = vw.ResultCache(store=store)
+    assert vw.dumps_json(vw.analyze_venmo_statement(statement, results=results)) == expected
+    assert vw.dumps_json(vw.analyze_venmo_statement(statement, results=results)) == expected
+    # A new cache only has the store to go on
+    fresh = vw.ResultCache(store=store)
+    assert vw.dumps_json(vw.analyze_venmo_statement(statement, results=fresh)) == expected
+    assert (results.hits, results.misses, fresh.disk_hits) == (1, 1, 1)
+
+def test_result_store_entries_are_json(statement, tmp_path):
+    results = vw.ResultCache(store=vw.ResultStore(tmp_path))
+    vw.analyze_venmo_statement(statement, results=results)
+    [(_, _, path)] = results.store.entries()
+    created, _, data = path.read_bytes().partition(b'\n')
+    assert float(created) > 0
+    assert data == vw.dumps_json(vw.analyze_venmo_statement(statement, results=False))
+    # Anything else in the store is dropped and recomputed
+    path.write_bytes(b'garbage')
+    assert vw.ResultCache(store=results.store).get(path.stem) is None
+    assert not path.exists()
@@ -0,0 +1,62 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import venmo_wrapped as vw
+
+class ThreadServer(vw.AnalysisServer):
+    """An AnalysisServer whose workers are threads, so tests can patch what they run."""
+
+    def start_pool(self):
+        return ThreadPoolExecutor(max_workers=self.workers)
+
+@pytest.mark.parametrize('line', ['[1]', '5', 'null', '{}', '{"id": 1}'])
+def test_server_rejects_malformed_requests(line):
+    server = vw.AnalysisServer(1, results=False)
+    try:
+        assert 'error' in server.handle(line)
+    finally:
+        server.close()
+
+def test_timed_out_requests_keep_their_slot_until_done(monkeypatch):
+    release = threading.Event()
+    def stuck(file_path, timeout, sections=None, results=None):
+        release.wait(10)
+        return {"file": file_path, "success": True, "data": {}}
+    monkeypatch.setattr(vw, 'analyze_with_deadline', stuck)
+    monkeypatch.setattr(vw, 'SERVE_TIMEOUT_GRACE', 0)
+    server = ThreadServer(1, timeout=0.05, max_pending=1, results=False)
+    try:
+        assert 'timed out' in server.handle('"a.csv"')['error']
+        assert not server.slots.acquire(blocking=False)
+        release.set()
+        deadline = time.monotonic() + 10
+        while not server.slots.acquire(blocking=False):
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        server.slots.release()
+    finally:
+        release.set()
+        server.close()
+
+def test_queued_requests_are_cancelled_on_timeout(monkeypatch):
+    release = threading.Event()
+    started = []
+    def stuck(file_path, timeout, sections=None, results=None):
+        started.append(file_path)
+        release.wait(10)
+        return {"file": file_path, "success": True, "data": {}}
+    monkeypatch.setattr(vw, 'analyze_with_deadline', stuck)
+    monkeypatch.setattr(vw, 'SERVE_TIMEOUT_GRACE', 0)
+    server = ThreadServer(1, timeout=0.05, max_pending=2, results=False)
+    try:
+        server.handle('"a.csv"')
+        # The one worker is still busy with a.csv, so b.csv never leaves the queue
+        assert 'timed out' in server.handle('"b.csv"')['error']
+    finally:
+        release.set()
+        # Let the pool run whatever is still queued
+        server.pool.shutdown()
+    assert started == ['a.csv']
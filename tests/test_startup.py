@@ -0,0 +1,16 @@
+import json
+import subprocess
+import sys
+
+from conftest import ROOT
+
+# Only the code paths that need them import these (pandas loads pyarrow
+# itself, but not its CSV reader or Feather)
+DEFERRED_MODULES = ['matplotlib', 'PIL', 'emoji', 'orjson', 'pyarrow.csv', 'pyarrow.feather']
+
+def test_import_defers_heavy_modules():
+    # A fresh interpreter, so nothing another test ran has loaded them
+    probe = (f'import json, sys; sys.path.insert(0, {str(ROOT)!r}); import venmo_wrapped; '
+             f'print(json.dumps([m for m in {DEFERRED_MODULES!r} if m in sys.modules]))')
+    out = subprocess.run([sys.executable, '-W', 'ignore', '-c', probe], capture_output=True, text=True, check=True)
+    assert json.loads(out.stdout) == []
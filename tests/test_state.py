@@ -0,0 +1,28 @@
+import json
+
+import numpy as np
+import pytest
+
+import venmo_wrapped as vw
+
+def month_slices(df):
+    """The payments frame cut into its calendar months, in order."""
+    months = df['Datetime'].dt.month.to_numpy()
+    return [df[months == month].reset_index(drop=True) for month in np.unique(months)]
+
+def test_merged_months_match_the_whole_statement(statements):
+    for path in statements:
+        df = vw.load_payments(path)
+        expected = vw.AnalysisState.from_frame(df).insights()
+        state = vw.AnalysisState()
+        for month in month_slices(df):
+            state.merge(vw.AnalysisState.from_frame(month))
+            # Through JSON each time, as --update-state keeps it
+            state = vw.AnalysisState.from_dict(json.loads(json.dumps(state.to_dict())))
+        assert vw.dumps_json(state.insights()) == vw.dumps_json(expected), path
+
+def test_merging_an_overlapping_statement_is_refused(statement):
+    df = vw.load_payments(statement)
+    state = vw.AnalysisState.from_frame(df)
+    with pytest.raises(ValueError, match='overlap'):
+        state.merge(vw.AnalysisState.from_frame(df))
@@ -0,0 +1,41 @@
+import os
+
+import pandas as pd
+import pytest
+
+import venmo_wrapped as vw
+
+pytest.importorskip('pyarrow')
+
+def test_statement_cache_round_trips_the_payments(statements, tmp_path):
+    cache = vw.StatementCache(tmp_path)
+    for path in statements:
+        expected = vw.load_payments(path)
+        vw.load_payments(path, cache=cache)
+        pd.testing.assert_frame_equal(cache.get(cache.key(path)), expected)
+        # And a statement analyzed from the cache comes out the same
+        assert vw.dumps_json(vw.analyze_venmo_statement(path, cache=cache, results=False)) == \
+            vw.dumps_json(vw.analyze_venmo_statement(path, results=False))
+
+def test_statement_cache_drops_corrupt_entries(statement, tmp_path):
+    cache = vw.StatementCache(tmp_path)
+    key = cache.key(statement)
+    cache.path(key).write_bytes(b'not a feather file')
+    assert cache.get(key) is None
+    assert not cache.path(key).exists()
+
+def test_statement_cache_evicts_the_least_recently_used(statements, tmp_path):
+    cache = vw.StatementCache(tmp_path)
+    for path in statements:
+        vw.load_payments(path, cache=cache)
+    sizes = sorted(size for _, size, _ in cache.entries())
+    # Age every entry so the refreshes below order them, whatever the mtime resolution
+    for _, _, path in cache.entries():
+        os.utime(path, (0, 0))
+    cache.max_bytes = sizes[-1] + sizes[-2]
+    # Reading the first entry makes it the most recent, so the next write evicts others
+    cache.get(cache.key(statements[0]))
+    cache.put(cache.key(statements[1]), vw.load_payments(statements[1]))
+    kept = {path.name for _, _, path in cache.entries()}
+    assert cache.path(cache.key(statements[0])).name in kept
+    assert sum(size for _, size, _ in cache.entries()) <= cache.max_bytes